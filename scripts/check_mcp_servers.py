@@ -10,11 +10,14 @@ Usage:
 """
 
 import sys
-import subprocess
 import importlib
+import importlib.util
 import os
-from pathlib import Path
-import time
+from contextlib import ExitStack, contextmanager
+
+# Heavier stdlib modules (subprocess, pathlib, time, shutil, json,
+# concurrent.futures) are imported inside the checks that need them, so
+# early-exit paths don't pay their load cost.
 
 # Color codes for terminal output
 class Colors:
@@ -25,27 +28,53 @@ class Colors:
     RESET = '\033[0m'
     BOLD = '\033[1m'
 
+# Drop the ANSI escapes entirely when output is piped (CI logs, tee) or
+# the user opted out via NO_COLOR; the prefix constants below then
+# collapse to plain text and no call site needs to care.
+if not sys.stdout.isatty() or os.environ.get('NO_COLOR'):
+    for _name in ('GREEN', 'RED', 'YELLOW', 'BLUE', 'RESET', 'BOLD'):
+        setattr(Colors, _name, '')
+
+# When --json is active every print helper becomes a no-op and the run
+# is reported as a single JSON document at the end instead.
+_json_mode = False
+
 def print_header(text):
     """Print a formatted header"""
+    if _json_mode:
+        return
     print(f"\n{Colors.BOLD}{Colors.BLUE}{'='*60}{Colors.RESET}")
     print(f"{Colors.BOLD}{Colors.BLUE}{text}{Colors.RESET}")
     print(f"{Colors.BOLD}{Colors.BLUE}{'='*60}{Colors.RESET}\n")
 
+# Message prefixes/suffix resolved once at import time, so the hot print
+# helpers do a single concatenation and write instead of re-reading
+# Colors attributes and formatting an f-string on every call.
+_OK = f"{Colors.GREEN}✓ "
+_ERR = f"{Colors.RED}✗ "
+_WARN = f"{Colors.YELLOW}⚠ "
+_INFO = f"{Colors.BLUE}ℹ "
+_RST = f"{Colors.RESET}\n"
+
 def print_success(text):
     """Print success message"""
-    print(f"{Colors.GREEN}✓ {text}{Colors.RESET}")
+    if not _json_mode:
+        sys.stdout.write(_OK + text + _RST)
 
 def print_error(text):
     """Print error message"""
-    print(f"{Colors.RED}✗ {text}{Colors.RESET}")
+    if not _json_mode:
+        sys.stdout.write(_ERR + text + _RST)
 
 def print_warning(text):
     """Print warning message"""
-    print(f"{Colors.YELLOW}⚠ {text}{Colors.RESET}")
+    if not _json_mode:
+        sys.stdout.write(_WARN + text + _RST)
 
 def print_info(text):
     """Print info message"""
-    print(f"{Colors.BLUE}ℹ {text}{Colors.RESET}")
+    if not _json_mode:
+        sys.stdout.write(_INFO + text + _RST)
 
 def check_python_version():
     """Check if Python version meets requirements"""
@@ -64,53 +93,97 @@ def check_python_path():
     """Check if Python is accessible"""
     print_header("2. Checking Python Executable")
     print_info(f"Python executable: {sys.executable}")
-    
-    # Check if 'python' command is available
-    try:
-        result = subprocess.run(['python', '--version'], 
-                              capture_output=True, text=True, timeout=5)
-        print_success(f"'python' command available: {result.stdout.strip()}")
-    except Exception as e:
-        print_warning(f"'python' command not available: {e}")
+
+    # Resolve the 'python' command without spawning an interpreter just
+    # to print its version - a PATH lookup answers availability, and for
+    # the current interpreter the version is already in sys.version_info.
+    import shutil
+    python_cmd = shutil.which('python')
+    if python_cmd:
+        if os.path.realpath(python_cmd) == os.path.realpath(sys.executable):
+            version = sys.version_info
+            print_success(
+                f"'python' command available: "
+                f"Python {version.major}.{version.minor}.{version.micro}"
+            )
+        else:
+            print_success(f"'python' command available at {python_cmd}")
+            print_info("  Note: it resolves to a different interpreter than this one")
+    else:
+        print_warning("'python' command not available")
         print_info("  Note: Use 'python3' instead on Unix/Linux systems")
-    
+
     return True
 
+def _probe_package(package):
+    """Check that a single package is importable, returning (package, ok, error)
+
+    Uses importlib.util.find_spec, which establishes presence without
+    executing the package's top-level code - heavy SDKs like openai and
+    anthropic spend hundreds of ms in module init we don't need here.
+    It handles dotted paths natively (only parent __init__ modules get
+    imported), and a sys.modules hit still skips the finders entirely,
+    mirroring Django's cached_import. Submodules are deliberately never
+    resolved as attributes of their parent - that is only guaranteed to
+    work after the submodule itself has been imported.
+    """
+    try:
+        if package in sys.modules or importlib.util.find_spec(package) is not None:
+            return package, True, None
+        return package, False, f"Cannot import {package}"
+    except ImportError as e:
+        return package, False, str(e)
+
+# Required packages paired with the pip distribution that provides each
+# one, so the failure hint never has to split the module path (and so
+# google.genai maps to its actual distribution, google-genai).
+REQUIRED_PACKAGES = (
+    ('mcp', 'mcp'),
+    ('mcp.server', 'mcp'),
+    ('mcp.server.fastmcp', 'mcp'),
+    ('anthropic', 'anthropic'),
+    ('openai', 'openai'),
+    ('google.genai', 'google-genai'),
+    ('aiofiles', 'aiofiles'),
+)
+
 def check_dependencies():
     """Check if required packages are installed"""
     print_header("3. Checking Required Dependencies")
-    
-    required_packages = [
-        'mcp',
-        'mcp.server',
-        'mcp.server.fastmcp',
-        'anthropic',
-        'openai',
-        'google.genai',
-        'aiofiles',
-    ]
-    
+
+    package_names = [package for package, _install in REQUIRED_PACKAGES]
+
+    # Probe only the deepest dotted path per prefix chain: resolving
+    # mcp.server.fastmcp also imports mcp and mcp.server, so the parents
+    # are confirmed afterwards via the sys.modules fast path instead of
+    # paying their own finder traversals.
+    leaves = [p for p in package_names
+              if not any(other != p and other.startswith(p + '.')
+                         for other in package_names)]
+
+    # Spec searches spend most of their time in disk I/O, which releases
+    # the GIL, so running them concurrently collapses the wall time
+    # toward the slowest single probe.
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=len(leaves)) as executor:
+        probed = {pkg: ok for pkg, ok, _err in executor.map(_probe_package, leaves)}
+
     all_ok = True
-    for package in required_packages:
-        try:
-            # Try to import the package
-            parts = package.split('.')
-            if len(parts) == 1:
-                importlib.import_module(package)
-            else:
-                # For nested imports like mcp.server
-                mod = importlib.import_module(parts[0])
-                for part in parts[1:]:
-                    mod = getattr(mod, part, None)
-                    if mod is None:
-                        raise ImportError(f"Cannot import {package}")
-            
+    for package, install in REQUIRED_PACKAGES:
+        if package in probed:
+            ok = probed[package]
+        else:
+            # Parent package, implicitly covered when a child probe
+            # succeeded; _probe_package resolves it from sys.modules
+            # and only runs a full spec search if the child failed.
+            _pkg, ok, _err = _probe_package(package)
+        if ok:
             print_success(f"Package '{package}' is installed")
-        except ImportError as e:
+        else:
             print_error(f"Package '{package}' is NOT installed")
-            print_info(f"  Install with: pip install {parts[0]}")
+            print_info(f"  Install with: pip install {install}")
             all_ok = False
-    
+
     return all_ok
 
 def check_encoding():
@@ -126,83 +199,229 @@ def check_encoding():
     # Check environment variable
     pythonioencoding = os.environ.get('PYTHONIOENCODING', 'Not set')
     print_info(f"PYTHONIOENCODING: {pythonioencoding}")
-    
-    # Check if UTF-8 encoding is set (case-insensitive)
-    stdout_is_utf8 = (stdout_enc != "unknown" and stdout_enc is not None and 
-                     stdout_enc.lower() == 'utf-8')
-    env_is_utf8 = (pythonioencoding != 'Not set' and pythonioencoding is not None and 
-                   pythonioencoding.lower() == 'utf-8')
-    
-    if stdout_is_utf8 or env_is_utf8:
+
+    # PEP 540 UTF-8 mode forces UTF-8 everywhere regardless of locale or
+    # environment, so nothing else needs checking.
+    if sys.flags.utf8_mode:
+        print_success("Python UTF-8 mode (PEP 540) is enabled")
+        return True
+
+    # Compare through the codec registry's canonical name, so spellings
+    # like 'utf8' or 'UTF8' are classified correctly instead of relying
+    # on lowercased string equality.
+    import codecs
+
+    def _is_utf8(name):
+        if not name or name in ('unknown', 'Not set'):
+            return False
+        try:
+            return codecs.lookup(name).name == 'utf-8'
+        except LookupError:
+            return False
+
+    if _is_utf8(stdout_enc) or _is_utf8(pythonioencoding):
         print_success("UTF-8 encoding is configured")
         return True
     else:
         print_warning("UTF-8 encoding not set. Set PYTHONIOENCODING=utf-8")
         return False
 
-def check_mcp_server(server_script, server_name, timeout=3):
-    """Test if an MCP server can start"""
-    print_header(f"5. Testing {server_name}")
-    
-    script_path = Path(server_script)
-    if not script_path.exists():
-        print_error(f"Server script not found: {server_script}")
-        return False
-    
-    print_info(f"Testing: {server_script}")
-    
+# Child environment for server probes, built once since it is identical
+# for every spawn (dict.copy is also cheaper than rebuilding via **unpack).
+_CHILD_ENV = os.environ.copy()
+_CHILD_ENV['PYTHONIOENCODING'] = 'utf-8'
+
+def _spawn_server(script_path):
+    """Start an MCP server subprocess for probing
+
+    Output goes to DEVNULL: on the happy path it is never read, and a
+    chatty server could otherwise fill the 64KB kernel pipe buffer and
+    hang before we terminate it. Failures are re-probed with a pipe.
+    """
+    import subprocess
+    return subprocess.Popen(
+        [sys.executable, str(script_path)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        env=_CHILD_ENV
+    )
+
+def _capture_server_stderr(script_path, timeout=3):
+    """Re-run a failed server once with a pipe to capture its stderr"""
+    import subprocess
     try:
-        # Start the server process
-        process = subprocess.Popen(
+        result = subprocess.run(
             [sys.executable, str(script_path)],
-            stdout=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
             stderr=subprocess.PIPE,
             text=True,
-            env={**os.environ, 'PYTHONIOENCODING': 'utf-8'}
+            timeout=timeout,
+            env=_CHILD_ENV
         )
-        
-        # Wait a bit for startup
-        time.sleep(timeout)
-        
-        # Check if process is still running
-        poll = process.poll()
-        
-        if poll is None:
-            # Process is still running - good sign
-            print_success(f"{server_name} started successfully")
+        return result.stderr
+    except Exception:
+        return None
+
+@contextmanager
+def _managed_server(script_path):
+    """Spawn a server process and guarantee it is cleaned up afterwards"""
+    import subprocess
+    process = _spawn_server(script_path)
+    try:
+        yield process
+    finally:
+        # process is always bound here (a failed spawn raises before the
+        # yield), so no defensive except is needed around the cleanup.
+        if process.poll() is None:
             process.terminate()
-            process.wait(timeout=2)
-            return True
-        else:
-            # Process exited
-            stdout, stderr = process.communicate()
-            if poll == 0:
-                print_warning(f"{server_name} exited normally (might be waiting for input)")
-                if stdout:
-                    print_info("stdout:\n" + stdout[:500])
-                return True
-            else:
-                print_error(f"{server_name} failed to start (exit code: {poll})")
-                if stderr:
-                    print_error("stderr:\n" + stderr[:500])
-                return False
-                
-    except Exception as e:
-        print_error(f"Failed to test {server_name}: {e}")
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                # Force kill if terminate didn't work
+                process.kill()
+                process.wait()
+
+def _evaluate_server(process, server_name, poll, script_path):
+    """Diagnose a probed server process after the startup wait"""
+    if poll is None:
+        # Process is still running - good sign
+        print_success(f"{server_name} started successfully")
+        process.terminate()
+        process.wait(timeout=2)
+        return True
+    elif poll == 0:
+        print_warning(f"{server_name} exited normally (might be waiting for input)")
+        return True
+    else:
+        print_error(f"{server_name} failed to start (exit code: {poll})")
+        # The first probe's output went to DEVNULL; re-run once with a
+        # pipe to collect the failure diagnostics.
+        stderr = _capture_server_stderr(script_path)
+        if stderr:
+            print_error("stderr:\n" + stderr[:500])
         return False
-    finally:
-        try:
-            if process.poll() is None:
-                process.terminate()
+
+# Probe results cached across runs, keyed by script path + interpreter
+# version and invalidated on mtime/size change, so unchanged servers in
+# a dev loop skip the multi-second startup wait.
+def _probe_cache_path():
+    """Location of the cached probe results"""
+    from pathlib import Path
+    return Path.home() / '.cache' / 'deepcode' / 'mcp_probe.json'
+
+def _probe_cache_key(script_path):
+    """Cache key for a server probe: absolute path plus Python version"""
+    return f"{script_path.resolve()}::{sys.version}"
+
+def _load_probe_cache():
+    """Load the cached probe results, tolerating a missing/corrupt file"""
+    import json
+    try:
+        with open(_probe_cache_path(), encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Valid JSON isn't necessarily the expected shape; anything other
+    # than a dict is treated like a corrupt file.
+    if not isinstance(cache, dict):
+        return {}
+    return cache
+
+def _store_probe_cache(cache):
+    """Persist probe results; caching is best-effort, so errors are ignored"""
+    import json
+    try:
+        cache_path = _probe_cache_path()
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+    except OSError:
+        pass
+
+def check_mcp_servers(servers, timeout=3, tool_files=None):
+    """Test if the given MCP servers can start, sharing one startup wait
+
+    All server processes are spawned first so a single sleep covers every
+    startup window, instead of paying the timeout once per server.
+    tool_files is an optional set of filenames from one scan of the
+    scripts' shared directory, used for existence checks instead of a
+    stat per script; pass None to fall back to Path.exists().
+    """
+    import subprocess
+    import time
+    from pathlib import Path
+
+    results = []
+    cache = _load_probe_cache()
+    cache_dirty = False
+    with ExitStack() as stack:
+        procs = []
+        for server_script, server_name in servers:
+            print_header(f"5. Testing {server_name}")
+
+            script_path = Path(server_script)
+            if tool_files is not None:
+                script_exists = script_path.name in tool_files
+            else:
+                script_exists = script_path.exists()
+            if not script_exists:
+                print_error(f"Server script not found: {server_script}")
+                procs.append((server_name, script_path, None, False, None))
+                continue
+
+            # A previous successful probe of this exact script (same
+            # mtime and size, same interpreter) is trusted without
+            # re-paying the startup wait; failures are always re-probed.
+            stat = script_path.stat()
+            entry = cache.get(_probe_cache_key(script_path))
+            if (isinstance(entry, dict) and entry.get('mtime') == stat.st_mtime
+                    and entry.get('size') == stat.st_size
+                    and entry.get('result')):
+                print_success(f"{server_name} started successfully (cached)")
+                procs.append((server_name, script_path, None, True, None))
+                continue
+
+            print_info(f"Testing: {server_script}")
+            try:
+                process = stack.enter_context(_managed_server(script_path))
+            except Exception as e:
+                print_error(f"Failed to test {server_name}: {e}")
+                procs.append((server_name, script_path, None, False, None))
+                continue
+            procs.append((server_name, script_path, process, False, stat))
+
+        # Wait for startup against a shared deadline; wait() returns as
+        # soon as a server exits, so crashed servers are diagnosed in
+        # milliseconds instead of burning the full timeout.
+        deadline = time.monotonic() + timeout
+        for server_name, script_path, process, cached, stat in procs:
+            if process is None:
+                results.append(cached)
+                continue
+            try:
+                remaining = max(deadline - time.monotonic(), 0)
                 try:
-                    process.wait(timeout=2)
+                    poll = process.wait(timeout=remaining)
                 except subprocess.TimeoutExpired:
-                    # Force kill if terminate didn't work
-                    process.kill()
-                    process.wait()
-        except Exception:
-            # Ignore cleanup errors
-            pass
+                    # Still running after the startup window - good sign
+                    poll = None
+                ok = _evaluate_server(process, server_name, poll, script_path)
+            except Exception as e:
+                print_error(f"Failed to test {server_name}: {e}")
+                ok = False
+            results.append(ok)
+            cache[_probe_cache_key(script_path)] = {
+                'mtime': stat.st_mtime,
+                'size': stat.st_size,
+                'result': ok,
+            }
+            cache_dirty = True
+
+    if cache_dirty:
+        _store_probe_cache(cache)
+
+    return results
 
 def check_pythonpath():
     """Check PYTHONPATH configuration"""
@@ -220,44 +439,81 @@ def check_pythonpath():
         print_info("  Set PYTHONPATH=. or add current directory to sys.path")
         return False
 
-def main():
+# Health checks in execution order; main() derives its result list from
+# these tables instead of appending call-by-call.
+CHECKS = (
+    ("Python Version", check_python_version),
+    ("Python Path", check_python_path),
+    ("Dependencies", check_dependencies),
+    ("Encoding", check_encoding),
+    ("PYTHONPATH", check_pythonpath),
+)
+
+# MCP servers probed together: (result label, script path, display name)
+SERVER_CHECKS = (
+    ("Command Executor", "tools/command_executor.py", "Command Executor Server"),
+    ("Code Implementation", "tools/code_implementation_server.py", "Code Implementation Server"),
+)
+
+def main(argv=None):
     """Run all health checks"""
-    print(f"\n{Colors.BOLD}{'='*60}")
-    print(f"  MCP Server Health Check")
-    print(f"{'='*60}{Colors.RESET}\n")
-    
-    results = []
-    
+    import argparse
+    global _json_mode
+
+    parser = argparse.ArgumentParser(description="MCP Server Health Check")
+    parser.add_argument('--json', action='store_true',
+                        help='emit a single machine-readable JSON report '
+                             'instead of colored output')
+    args = parser.parse_args(argv)
+    _json_mode = args.json
+
+    if not _json_mode:
+        print(f"\n{Colors.BOLD}{'='*60}")
+        print(f"  MCP Server Health Check")
+        print(f"{'='*60}{Colors.RESET}\n")
+
     # Run checks
-    results.append(("Python Version", check_python_version()))
-    results.append(("Python Path", check_python_path()))
-    results.append(("Dependencies", check_dependencies()))
-    results.append(("Encoding", check_encoding()))
-    results.append(("PYTHONPATH", check_pythonpath()))
-    
-    # Test MCP servers
-    results.append(("Command Executor", check_mcp_server(
-        "tools/command_executor.py", 
-        "Command Executor Server"
-    )))
-    results.append(("Code Implementation", check_mcp_server(
-        "tools/code_implementation_server.py",
-        "Code Implementation Server"
-    )))
-    
+    results = [(name, check()) for name, check in CHECKS]
+
+    # Test MCP servers (spawned together so the startup wait is paid
+    # once); one scan of tools/ covers the existence check for both
+    # scripts instead of a stat apiece.
+    try:
+        tool_files = {entry.name for entry in os.scandir('tools')}
+    except (FileNotFoundError, NotADirectoryError):
+        tool_files = None
+    server_results = check_mcp_servers(
+        [(script, display) for _label, script, display in SERVER_CHECKS],
+        tool_files=tool_files,
+    )
+    results += [(label, ok)
+                for (label, _script, _display), ok in zip(SERVER_CHECKS, server_results)]
+
+    passed = sum(ok for _, ok in results)
+    total = len(results)
+
+    if _json_mode:
+        import json
+        report = {
+            "checks": {name: bool(ok) for name, ok in results},
+            "passed": passed,
+            "total": total,
+        }
+        sys.stdout.write(json.dumps(report) + "\n")
+        return 0 if passed == total else 1
+
     # Print summary
     print_header("Summary")
-    
-    passed = sum(1 for _, result in results if result)
-    total = len(results)
-    
-    for name, result in results:
-        if result:
-            print_success(f"{name}: PASS")
-        else:
-            print_error(f"{name}: FAIL")
-    
-    print(f"\n{Colors.BOLD}Total: {passed}/{total} checks passed{Colors.RESET}\n")
+
+    # Assemble the summary as one string so it goes out in a single
+    # write instead of one syscall per line.
+    lines = [
+        (_OK if result else _ERR) + f"{name}: {'PASS' if result else 'FAIL'}" + _RST
+        for name, result in results
+    ]
+    lines.append(f"\n{Colors.BOLD}Total: {passed}/{total} checks passed{Colors.RESET}\n\n")
+    sys.stdout.write(''.join(lines))
+    sys.stdout.flush()
     
     if passed == total:
         print_success("All checks passed! Your MCP server setup is ready.")